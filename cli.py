@@ -1,23 +1,27 @@
 import argparse
 
+from server import DEFAULT_SOCKET
+
 
 def parse_arguments():
     parser = argparse.ArgumentParser(
         description="Generate subtitles for a video or audio file using OpenAI Whisper."
     )
 
-    # Input file (Required)
+    # Input files (Required, except with --serve)
     parser.add_argument(
         "input_file",
         type=str,
-        help="Path to the input video or audio file (mp4, mp3, wav, etc.)."
+        nargs="*",
+        help="Path(s) to the input video or audio file(s) (mp4, mp3, wav, etc.)."
     )
 
     # Output file (Optional)
     parser.add_argument(
         "-o", "--output",
         type=str,
-        help="Path to save the output (video with subtitles for video input, SRT file for audio input)."
+        help="Path to save the output (video with subtitles for video input, SRT file for audio input). "
+             "With several inputs, use '{name}' for each input's base name (e.g. 'subs/{name}.srt')."
     )
 
     # Flag to hide the live window (Optional)
@@ -27,6 +31,15 @@ def parse_arguments():
         help="Do not show the video window live (faster processing)."
     )
 
+    # Real-time preview pacing (Optional)
+    parser.add_argument(
+        "--realtime-preview",
+        action="store_true",
+        help="Play the live window at the video's frame rate while saving --output. By default, "
+             "frames are then processed as fast as possible and the window shows a few frames per "
+             "second. Without --output the window always plays at normal speed."
+    )
+
     # Model selection (Optional)
     parser.add_argument(
         "--model",
@@ -36,6 +49,58 @@ def parse_arguments():
         help="Whisper model size."
     )
 
+    # Inference backend (Optional)
+    parser.add_argument(
+        "--backend",
+        type=str,
+        default="faster-whisper",
+        choices=["faster-whisper", "whisper"],
+        help="Inference backend: 'faster-whisper' (CTranslate2, int8, faster) or 'whisper' (reference PyTorch). "
+             "Runs on a CUDA GPU with FP16 when available; FP16 stays disabled on CPU."
+    )
+
+    # Inference device (Optional)
+    parser.add_argument(
+        "--device",
+        type=str,
+        default="auto",
+        choices=["auto", "cpu", "cuda"],
+        help="Device to run the model on. 'auto' uses a CUDA GPU when available."
+    )
+
+    # torch.compile the decoder (Optional)
+    parser.add_argument(
+        "--compile",
+        action="store_true",
+        help="Compile the Whisper decoder with torch.compile ('whisper' backend only). "
+             "Adds a one-time compile cost at startup, faster decoding afterwards."
+    )
+
+    # Fast model loading (Optional)
+    parser.add_argument(
+        "--fast-load",
+        action="store_true",
+        help="Load Whisper weights from a memory-mapped safetensors copy ('whisper' backend only). "
+             "The copy is created on first use."
+    )
+
+    # Batched inference (Optional)
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=1,
+        help="Number of 30s audio windows to transcribe per batch. Values > 1 enable batched "
+             "inference (much faster on GPU; windows are cut at fixed 30s boundaries)."
+    )
+
+    # Voice activity detection (Optional)
+    parser.add_argument(
+        "--no-vad",
+        action="store_true",
+        help="Transcribe silent parts too. By default the 'faster-whisper' backend skips "
+             "non-speech audio using voice activity detection."
+    )
+
     # Compression flag (Optional)
     parser.add_argument(
         "--compress",
@@ -43,6 +108,25 @@ def parse_arguments():
         help="Compress output video significantly (reduces file size, slower processing)."
     )
 
+    # Burn subtitles with ffmpeg (Optional)
+    parser.add_argument(
+        "--burn-native",
+        action="store_true",
+        help="With --no-show and --output, burn the subtitles in with ffmpeg's subtitles filter in a "
+             "single pass instead of drawing them frame by frame (fastest; slightly different style)."
+    )
+
+    # Hardware video encoder (Optional)
+    parser.add_argument(
+        "--hwaccel",
+        type=str,
+        default="auto",
+        choices=["auto", "nvenc", "videotoolbox", "vaapi", "qsv", "none"],
+        help="Hardware H.264 encoder for the output video. 'auto' uses the first one that works "
+             "(NVENC, VideoToolbox, VAAPI, QSV), 'none' forces software libx264. With NVENC and "
+             "VideoToolbox the input is also decoded on the GPU."
+    )
+
     # Language (Optional)
     parser.add_argument(
         "--language",
@@ -58,4 +142,30 @@ def parse_arguments():
         help="Translate speech to English (instead of transcribing in original language)."
     )
 
-    return parser.parse_args()
+    # Server mode (Optional)
+    parser.add_argument(
+        "--serve",
+        action="store_true",
+        help="Run as a server that keeps the Whisper model loaded and processes jobs sent with --server."
+    )
+
+    # Socket for server mode (Optional)
+    parser.add_argument(
+        "--socket",
+        type=str,
+        default=DEFAULT_SOCKET,
+        help=f"Unix socket the server listens on (default: {DEFAULT_SOCKET})."
+    )
+
+    # Send job to a running server (Optional)
+    parser.add_argument(
+        "--server",
+        type=str,
+        metavar="SOCKET",
+        help="Send this job to a server started with --serve instead of loading the model here."
+    )
+
+    args = parser.parse_args()
+    if not args.input_file and not args.serve:
+        parser.error("the following arguments are required: input_file")
+    return args
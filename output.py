@@ -1,3 +1,14 @@
+from functools import lru_cache
+
+import numpy as np
+
+from utils import segments_to_soa
+
+# Below this many timestamps the one-time Numba compile costs more than it saves
+NUMBA_MIN_TIMESTAMPS = 50000
+TIMESTAMP_WIDTH = 12  # len("HH:MM:SS,mmm")
+
+
 def format_timestamp_srt(seconds):
     """
     Converts seconds to SRT timestamp format: HH:MM:SS,mmm
@@ -9,16 +20,98 @@ def format_timestamp_srt(seconds):
     return f"{hours:02d}:{minutes:02d}:{secs:02d},{millis:03d}"
 
 
+def split_timestamps(seconds):
+    """
+    Vectorized timestamp decomposition for an array of seconds.
+    Returns: (hours, minutes, seconds, milliseconds) integer arrays.
+    """
+    hours = (seconds // 3600).astype(np.int64)
+    minutes = ((seconds % 3600) // 60).astype(np.int64)
+    secs = (seconds % 60).astype(np.int64)
+    millis = ((seconds - seconds.astype(np.int64)) * 1000).astype(np.int64)
+    return hours, minutes, secs, millis
+
+
+def _fill_timestamps(seconds, out):
+    """
+    Writes each time in seconds as ASCII 'HH:MM:SS,mmm' into out, 12 bytes per timestamp.
+    Same arithmetic as format_timestamp_srt; hours must be below 100.
+    """
+    for i in range(seconds.shape[0]):
+        total = seconds[i]
+        hours = int(total // 3600)
+        minutes = int((total % 3600) // 60)
+        secs = int(total % 60)
+        millis = int((total - int(total)) * 1000)
+
+        o = i * 12
+        out[o] = 48 + hours // 10
+        out[o + 1] = 48 + hours % 10
+        out[o + 2] = 58  # ':'
+        out[o + 3] = 48 + minutes // 10
+        out[o + 4] = 48 + minutes % 10
+        out[o + 5] = 58  # ':'
+        out[o + 6] = 48 + secs // 10
+        out[o + 7] = 48 + secs % 10
+        out[o + 8] = 44  # ','
+        out[o + 9] = 48 + millis // 100
+        out[o + 10] = 48 + (millis // 10) % 10
+        out[o + 11] = 48 + millis % 10
+
+
+@lru_cache(maxsize=1)
+def _numba_fill_timestamps():
+    """
+    Numba-compiled _fill_timestamps, or None if Numba is not installed.
+    Imported lazily: loading Numba takes longer than short transcripts need.
+    """
+    try:
+        from numba import njit
+    except ImportError:
+        return None
+    return njit(cache=True)(_fill_timestamps)
+
+
+def format_timestamps_srt(seconds):
+    """
+    Formats an array of times in seconds as SRT timestamps.
+    Returns: list of 'HH:MM:SS,mmm' strings.
+
+    Long transcripts are formatted by a Numba-compiled kernel into one preallocated byte
+    buffer when Numba is installed; otherwise the vectorized NumPy path is used.
+    """
+    kernel = None
+    if len(seconds) >= NUMBA_MIN_TIMESTAMPS and seconds.max() < 100 * 3600:
+        kernel = _numba_fill_timestamps()
+
+    if kernel is not None:
+        out = np.empty(len(seconds) * TIMESTAMP_WIDTH, dtype=np.uint8)
+        kernel(seconds, out)
+        stamps = out.tobytes().decode('ascii')
+        return [stamps[i:i + TIMESTAMP_WIDTH] for i in range(0, len(stamps), TIMESTAMP_WIDTH)]
+
+    return [
+        f"{h:02d}:{m:02d}:{s:02d},{ms:03d}"
+        for h, m, s, ms in zip(*(part.tolist() for part in split_timestamps(seconds)))
+    ]
+
+
 def write_srt(segments, output_path):
     """
     Writes transcription segments to an SRT subtitle file.
+    The whole file is formatted in memory and written with a single write call.
     """
+    starts, ends, texts = segments_to_soa(segments)
+    start_stamps = format_timestamps_srt(starts)
+    end_stamps = format_timestamps_srt(ends)
+
+    srt = ''.join(
+        f"{i}\n{start} --> {end}\n{text.strip()}\n\n"
+        for i, (start, end, text) in enumerate(zip(start_stamps, end_stamps, texts), 1)
+    )
+
     with open(output_path, 'w', encoding='utf-8') as f:
-        for i, seg in enumerate(segments, 1):
-            start = format_timestamp_srt(seg['start'])
-            end = format_timestamp_srt(seg['end'])
-            text = seg['text'].strip()
-            f.write(f"{i}\n{start} --> {end}\n{text}\n\n")
+        f.write(srt)
 
 
 def write_raw_tokens(result, output_path, task="transcribe"):
@@ -27,19 +120,11 @@ def write_raw_tokens(result, output_path, task="transcribe"):
     Format: <|startoftranscript|><|en|><|transcribe|><|0.00|>Hello world<|2.50|>...<|endoftranscript|>
     """
     lang = result['language']
-    segments = result['segments']
-
-    # Build token string with special tokens
-    output = f"<|startoftranscript|><|{lang}|><|{task}|>"
-
-    for seg in segments:
-        # Add timestamp token for segment start
-        start_time = seg['start']
-        output += f"<|{start_time:.2f}|>"
-        # Add the transcribed text
-        output += seg['text']
+    starts, _, texts = segments_to_soa(result['segments'])
 
-    output += "<|endoftranscript|>"
+    # Build token string with special tokens: a timestamp token for each segment start, then its text
+    body = ''.join(f"<|{start_time:.2f}|>{text}" for start_time, text in zip(starts.tolist(), texts))
+    output = f"<|startoftranscript|><|{lang}|><|{task}|>{body}<|endoftranscript|>"
 
     with open(output_path, 'w', encoding='utf-8') as f:
         f.write(output)
@@ -0,0 +1,92 @@
+import os
+import sys
+import json
+import socket
+
+DEFAULT_SOCKET = "/tmp/whisper.sock"
+
+# Options a client forwards to the server with each job
+JOB_FIELDS = ("input_file", "output", "translate", "language", "compress", "hwaccel", "burn_native", "batch_size", "no_vad")
+
+
+def serve(socket_path, run_job):
+    """
+    Listens on a Unix socket and runs jobs one at a time while the model stays loaded.
+
+    Each connection carries one JSON job (a line with the JOB_FIELDS) and gets back
+    {"ok": true} or {"ok": false, "error": "..."} once the job has finished.
+
+    Args:
+        socket_path: Path of the Unix socket to listen on
+        run_job: Callable that runs one job dict
+    """
+    if os.path.exists(socket_path):
+        os.remove(socket_path)
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as server:
+        server.bind(socket_path)
+        server.listen()
+        print(f"Server listening on {socket_path}. Press Ctrl+C to stop.")
+
+        try:
+            while True:
+                conn, _ = server.accept()
+                with conn:
+                    _handle_connection(conn, run_job)
+        except KeyboardInterrupt:
+            print("\nServer stopped.")
+        finally:
+            os.remove(socket_path)
+
+
+def _handle_connection(conn, run_job):
+    """
+    Reads one job from the connection, runs it, and replies with the outcome.
+    """
+    with conn.makefile('r', encoding='utf-8') as reader:
+        line = reader.readline()
+
+    try:
+        job = json.loads(line)
+        print(f"\nReceived job: {job.get('input_file')}")
+        run_job(job)
+        response = {"ok": True}
+    except SystemExit:
+        response = {"ok": False, "error": "Job failed (see server output)."}
+    except Exception as e:
+        print(f"Error while running job: {e}")
+        response = {"ok": False, "error": str(e)}
+
+    try:
+        conn.sendall((json.dumps(response) + "\n").encode('utf-8'))
+    except OSError:
+        pass  # Client went away
+
+
+def submit_job(socket_path, args):
+    """
+    Sends the job described by the CLI arguments to a running server and waits for it to finish.
+    """
+    job = {field: getattr(args, field) for field in JOB_FIELDS}
+    # The server may run in another working directory
+    job["input_file"] = os.path.abspath(job["input_file"])
+    if job["output"]:
+        job["output"] = os.path.abspath(job["output"])
+
+    print(f"Sending job to server at {socket_path} (progress is shown in the server's output)...")
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.connect(socket_path)
+            client.sendall((json.dumps(job) + "\n").encode('utf-8'))
+            with client.makefile('r', encoding='utf-8') as reader:
+                line = reader.readline()
+    except OSError as e:
+        print(f"Error: Could not reach server at '{socket_path}': {e}")
+        print("Start one with: python speech_to_text.py --serve")
+        sys.exit(1)
+
+    response = json.loads(line) if line else {"ok": False, "error": "Server closed the connection."}
+    if not response["ok"]:
+        print(f"Error: {response['error']}")
+        sys.exit(1)
+    print("Done.")
@@ -1,13 +1,13 @@
 import os
 import sys
+import argparse
 import warnings
-
-import whisper
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 
 from cli import parse_arguments
-from utils import check_ffmpeg, is_headless, is_audio_only, get_output_format
-from output import write_srt, write_raw_tokens
-from video import process_video
+from utils import check_ffmpeg, is_headless, is_audio_only, get_output_format, probe_streams
+from transcription import load_model, transcribe, transcribe_in_background
 
 # Suppress the noisy NumPy version warning from SciPy
 warnings.filterwarnings("ignore", category=UserWarning, module='scipy')
@@ -16,9 +16,98 @@ warnings.filterwarnings("ignore", category=UserWarning, module='scipy')
 def main():
     args = parse_arguments()
 
+    # One set of options per input file
+    if len(args.input_file) > 1 and args.output and "{name}" not in args.output:
+        print("Error: With several input files, --output must contain '{name}' (e.g. 'subs/{name}.srt').")
+        sys.exit(1)
+    jobs = [job_arguments(args, input_file) for input_file in args.input_file]
+
+    # Forward the jobs to a running server instead of loading a model here
+    if args.server:
+        from server import submit_job
+        for job in jobs:
+            if not os.path.exists(job.input_file):
+                print(f"Error: Input file '{job.input_file}' not found.")
+                sys.exit(1)
+        for job in jobs:
+            submit_job(args.server, job)
+        return
+
     # 0. Check Dependencies
     check_ffmpeg()
 
+    # 1-3. Validate inputs, detect audio-only files and headless environments
+    audio_only = [prepare_job(job) for job in jobs]
+
+    # 4. Load Whisper Model
+    print(f"Loading Whisper model ('{args.model}', backend: {args.backend})...")
+    if args.compile and args.backend != "whisper":
+        print("WARNING: --compile only applies to the 'whisper' backend. Ignoring.")
+    if args.fast_load and args.backend != "whisper":
+        print("WARNING: --fast-load only applies to the 'whisper' backend. Ignoring.")
+    if args.batch_size > 1 and args.no_vad and args.backend == "faster-whisper":
+        print("WARNING: Batched 'faster-whisper' inference needs VAD. Ignoring --batch-size with --no-vad.")
+    model = load_model(
+        args.model, backend=args.backend, compile_decoder=args.compile,
+        fast_load=args.fast_load, device=args.device
+    )
+
+    # Server mode: keep the model loaded and run jobs sent with --server
+    if args.serve:
+        from server import serve
+        serve(args.socket, lambda job: run_server_job(model, args, job))
+        return
+
+    # 5-7. Transcribe and write the outputs. With several files, videos are rendered in
+    # background processes while the next file is being transcribed.
+    if len(jobs) == 1:
+        run_job(model, jobs[0], audio_only[0])
+        return
+
+    # Workers are spawned, not forked: forking after the model loaded would copy its memory
+    # and threads (and possibly a CUDA context) into every worker
+    with ProcessPoolExecutor(max_workers=2, mp_context=multiprocessing.get_context("spawn")) as executor:
+        renders = []
+        for job, job_audio_only in zip(jobs, audio_only):
+            print(f"\n=== {job.input_file} ===")
+            future = run_job(model, job, job_audio_only, executor=executor)
+            if future is not None:
+                renders.append((job, future))
+
+        if renders:
+            print("\nWaiting for background video rendering to finish...")
+
+    failed = False
+    for job, future in renders:
+        try:
+            if not future.result():
+                print(f"Error rendering '{job.input_file}': ffmpeg could not write '{job.output}'.")
+                failed = True
+        except Exception as e:
+            print(f"Error rendering '{job.input_file}': {e}")
+            failed = True
+    if failed:
+        sys.exit(1)
+    print("All files done.")
+
+
+def job_arguments(args, input_file):
+    """
+    Options for a single input file: '{name}' in --output is replaced by the input's base name.
+    """
+    job = argparse.Namespace(**vars(args))
+    job.input_file = input_file
+    if args.output:
+        name = os.path.splitext(os.path.basename(input_file))[0]
+        job.output = args.output.replace("{name}", name)
+    return job
+
+
+def prepare_job(args):
+    """
+    Validates the input file and adjusts options for audio-only input and headless environments.
+    Returns: True if the input is audio-only.
+    """
     # 1. Validation
     if not os.path.exists(args.input_file):
         print(f"Error: Input file '{args.input_file}' not found.")
@@ -41,10 +130,17 @@ def main():
             print("         The script will run but you won't see the result.")
             print("         Use -o output.mp4 to save the result.\n")
 
-    # 4. Load Whisper Model
-    print(f"Loading Whisper model ('{args.model}')...")
-    model = whisper.load_model(args.model)
+    return audio_only
 
+
+def run_job(model, args, audio_only, executor=None):
+    """
+    Transcribes (or translates) one input with an already loaded model and writes the output.
+
+    If an executor is given, a video output without live window is rendered in the background;
+    the returned future resolves to False if ffmpeg failed to write it. Otherwise returns None,
+    exiting with status 1 if a video could not be written.
+    """
     # 5. Transcribe (or Translate)
     task = "translate" if args.translate else "transcribe"
     if args.translate:
@@ -52,20 +148,40 @@ def main():
     else:
         print("Transcribing audio... (This may take some time)")
 
-    # We use fp16=False to avoid warnings if you are on a CPU
-    transcribe_options = {"fp16": False, "task": task}
     if args.language:
-        transcribe_options["language"] = args.language
         print(f"Source language: {args.language}")
-    result = model.transcribe(args.input_file, **transcribe_options)
-    print(f"Detected/used language: {result['language']}")
-    if args.translate:
-        print("Translated to: English")
-    segments = result["segments"]
-    print("Transcription complete.")
+    transcribe_options = dict(
+        backend=args.backend, task=task, language=args.language,
+        batch_size=args.batch_size, vad_filter=not args.no_vad
+    )
 
     # 6. Determine output format and handle accordingly
     output_format = get_output_format(args.output)
+    render_in_background = executor is not None and args.no_show and args.output
+    burn_native = args.burn_native and args.no_show and args.output
+    if args.burn_native and not burn_native and not audio_only and output_format not in ('srt', 'txt'):
+        print("WARNING: --burn-native needs --no-show and --output. Drawing subtitles frame by frame.")
+
+    # 7. Process video files (OpenCV is only imported when a video is actually rendered).
+    # Rendering starts right away and draws subtitles as the transcription produces them.
+    if not audio_only and output_format not in ('srt', 'txt') and not render_in_background and not burn_native:
+        from video import process_video
+        stream = transcribe_in_background(model, args.input_file, **transcribe_options)
+        try:
+            written = process_video(**video_options(args, stream))
+        finally:
+            # Nothing is left to draw (the video ended or the preview was closed)
+            stream.cancel()
+        report_transcription(args, stream.result())
+        if not written:
+            sys.exit(1)
+        print("Done.")
+        return
+
+    result = transcribe(model, args.input_file, **transcribe_options)
+    report_transcription(args, result)
+    segments = result["segments"]
+    from output import write_srt, write_raw_tokens
 
     # Handle text-based outputs (SRT or raw tokens)
     if output_format in ('srt', 'txt'):
@@ -94,16 +210,65 @@ def main():
         print("Done.")
         return
 
-    # 7. Process video files
-    process_video(
+    # Subtitles burned in by ffmpeg (--burn-native) or, with several files, a video rendered
+    # in a background process while the next file is transcribed
+    from video import burn_subtitles, process_video
+    if burn_native:
+        render = burn_subtitles
+        options = dict(
+            input_file=args.input_file,
+            output_path=args.output,
+            segments=segments,
+            compress=args.compress,
+            hwaccel=args.hwaccel
+        )
+    else:
+        render = process_video
+        options = video_options(args, segments)
+
+    if render_in_background:
+        print(f"Rendering '{args.output}' in the background...")
+        return executor.submit(render, **options)
+    if not render(**options):
+        sys.exit(1)
+    print("Done.")
+
+
+def report_transcription(args, result):
+    """
+    Prints the language of a finished transcription.
+    """
+    print(f"Detected/used language: {result['language']}")
+    if args.translate:
+        print("Translated to: English")
+    print("Transcription complete.")
+
+
+def video_options(args, segments):
+    """
+    Keyword arguments for video.process_video.
+    """
+    return dict(
         input_file=args.input_file,
         output_path=args.output,
         segments=segments,
         no_show=args.no_show,
-        compress=args.compress
+        compress=args.compress,
+        hwaccel=args.hwaccel,
+        realtime_preview=args.realtime_preview
     )
 
-    print("Done.")
+
+def run_server_job(model, args, job):
+    """
+    Runs a job received by the server: the server's options, overridden by the job's fields.
+    There is no live window in server mode.
+    """
+    # Files may change between jobs, and the server would otherwise keep every probe forever
+    probe_streams.cache_clear()
+    job_args = argparse.Namespace(**{**vars(args), **job, 'no_show': True})
+    audio_only = prepare_job(job_args)
+    run_job(model, job_args, audio_only)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,316 @@
+import os
+import json
+import threading
+from dataclasses import asdict
+
+
+def load_model(model_name, backend="faster-whisper", compile_decoder=False, fast_load=False, device="auto"):
+    """
+    Loads a Whisper model for the selected backend.
+
+    Args:
+        model_name: Whisper model size (tiny, base, small, medium, large)
+        backend: 'faster-whisper' (CTranslate2, int8) or 'whisper' (reference PyTorch)
+        compile_decoder: If True, wrap the decoder with torch.compile ('whisper' backend only)
+        fast_load: If True, load the weights from a safetensors copy ('whisper' backend only)
+        device: 'auto' (CUDA GPU when available), 'cpu' or 'cuda'
+    """
+    if backend == "faster-whisper":
+        # CTranslate2 with dynamic int8 weight quantization (int8 weights + fp16 activations on GPU)
+        import ctranslate2
+        from faster_whisper import WhisperModel
+        device = _select_device(device, ctranslate2.get_cuda_device_count() > 0)
+        compute_type = "int8_float16" if device == "cuda" else "int8"
+        print(f"Using device: {device} ({compute_type})")
+        return WhisperModel(model_name, device=device, compute_type=compute_type)
+
+    import torch
+    import whisper
+    device = _select_device(device, torch.cuda.is_available())
+    print(f"Using device: {device} ({'fp16' if device == 'cuda' else 'fp32'})")
+    if fast_load:
+        model = load_whisper_safetensors(model_name, device)
+    else:
+        model = whisper.load_model(model_name, device=device)
+    if compile_decoder:
+        _compile_decoder(model)
+    return model
+
+
+def _select_device(device, cuda_available):
+    """
+    Resolves the --device option: 'auto' picks CUDA when available, and a requested
+    'cuda' falls back to the CPU (with a warning) when no GPU can be used.
+    """
+    if device == "auto":
+        return "cuda" if cuda_available else "cpu"
+    if device == "cuda" and not cuda_available:
+        print("WARNING: No CUDA device available. Falling back to CPU.")
+        return "cpu"
+    return device
+
+
+def _whisper_cache_dir():
+    """
+    Directory where openai-whisper stores downloaded checkpoints.
+    """
+    return os.path.join(os.getenv("XDG_CACHE_HOME", os.path.expanduser("~/.cache")), "whisper")
+
+
+def load_whisper_safetensors(model_name, device):
+    """
+    Loads a reference Whisper model from a safetensors copy of its checkpoint.
+
+    safetensors memory-maps the weights instead of unpickling them, which makes cold starts
+    faster. On first use the standard checkpoint is loaded (and downloaded if needed) and
+    converted to <cache>/<model>.safetensors.
+    """
+    import torch
+    import whisper
+    from safetensors import safe_open
+    from safetensors.torch import save_file
+    from whisper.model import ModelDimensions, Whisper
+
+    path = os.path.join(_whisper_cache_dir(), f"{model_name}.safetensors")
+    if not os.path.exists(path):
+        print(f"Converting Whisper model ('{model_name}') to safetensors (one-time)...")
+        model = whisper.load_model(model_name, device=device)
+        # Store in fp16 like the original checkpoint; load_state_dict casts back on load
+        state = {
+            name: (t.half() if t.is_floating_point() else t).contiguous().cpu()
+            for name, t in model.state_dict().items()
+        }
+        save_file(state, path, metadata={"dims": json.dumps(asdict(model.dims))})
+        return model
+
+    with safe_open(path, framework="pt", device="cpu") as f:
+        dims = ModelDimensions(**json.loads(f.metadata()["dims"]))
+        state = {name: f.get_tensor(name) for name in f.keys()}
+
+    model = Whisper(dims)
+    model.load_state_dict(state)
+    # Alignment heads are not part of the state dict (see whisper.load_model)
+    if model_name in whisper._ALIGNMENT_HEADS:
+        model.set_alignment_heads(whisper._ALIGNMENT_HEADS[model_name])
+    return model.to(torch.device(device))
+
+
+def _compile_decoder(model):
+    """
+    Compiles the Whisper decoder with torch.compile and warms it up on 30s of silence,
+    so the one-time compilation cost is paid before the real transcription starts.
+    """
+    import numpy as np
+    import torch
+    import whisper
+
+    print("Compiling Whisper decoder (one-time cost)...")
+    model.decoder = torch.compile(model.decoder, mode="reduce-overhead", fullgraph=False)
+
+    silence = np.zeros(whisper.audio.N_SAMPLES, dtype=np.float32)
+    mel = whisper.log_mel_spectrogram(silence, n_mels=model.dims.n_mels)
+    mel = whisper.pad_or_trim(mel, whisper.audio.N_FRAMES).to(model.device)
+    model.decode(mel, whisper.DecodingOptions(fp16=_use_fp16(model)))
+
+
+def _use_fp16(model):
+    """
+    FP16 inference on CUDA only (on CPU it is unsupported and Whisper falls back to FP32 with a warning).
+    """
+    return model.device.type == "cuda"
+
+
+def transcribe(model, input_file, backend="faster-whisper", task="transcribe", language=None, batch_size=1,
+               vad_filter=True, on_segment=None):
+    """
+    Transcribes (or translates) a file and returns a Whisper-style result dict:
+    {'language': ..., 'segments': [{'start': ..., 'end': ..., 'text': ...}, ...]}
+
+    With batch_size > 1 the audio is split into independent 30s windows that are
+    run through the model in batches instead of one window at a time.
+
+    faster-whisper decodes greedily (beam_size=1, like the reference transcribe) and, with
+    vad_filter, skips the silent parts of the audio. vad_filter has no effect on 'whisper'.
+    faster-whisper's batched pipeline needs VAD to split the audio, so without it batch_size
+    is ignored there.
+
+    on_segment, if given, is called with each segment as soon as it is available
+    (faster-whisper decodes lazily; the 'whisper' backend delivers them all at the end).
+    Returning False from it stops the transcription early.
+    """
+    if backend == "faster-whisper":
+        if batch_size > 1 and vad_filter:
+            from faster_whisper import BatchedInferencePipeline
+            pipeline = BatchedInferencePipeline(model=model)
+            segments_iter, info = pipeline.transcribe(
+                input_file, task=task, language=language, batch_size=batch_size,
+                beam_size=1, vad_filter=vad_filter
+            )
+        else:
+            segments_iter, info = model.transcribe(
+                input_file, task=task, language=language, beam_size=1, vad_filter=vad_filter
+            )
+        segments = []
+        for s in segments_iter:
+            segment = {'start': s.start, 'end': s.end, 'text': s.text}
+            segments.append(segment)
+            if on_segment is not None and on_segment(segment) is False:
+                break
+        return {'language': info.language, 'segments': segments}
+
+    if batch_size > 1:
+        result = _transcribe_batched(model, input_file, task, language, batch_size)
+    else:
+        transcribe_options = {"fp16": _use_fp16(model), "task": task}
+        if language:
+            transcribe_options["language"] = language
+        result = model.transcribe(input_file, **transcribe_options)
+
+    if on_segment is not None:
+        for segment in result['segments']:
+            if on_segment(segment) is False:
+                break
+    return result
+
+
+class SegmentStream:
+    """
+    Segments of a transcription that is still running, shared between the thread that
+    produces them and the video loop that draws them.
+    """
+
+    def __init__(self):
+        self.segments = []
+        self.complete = False
+        self.cancelled = False
+        self.error = None
+        self._result = None
+        self._changed = threading.Condition()
+
+    def add(self, segment):
+        """
+        Publishes a new segment. Returns: False once the stream was cancelled.
+        """
+        with self._changed:
+            self.segments.append(segment)
+            self._changed.notify_all()
+        return not self.cancelled
+
+    def finish(self, result=None, error=None):
+        """
+        Marks the transcription as complete (or failed) and wakes up waiting readers.
+        """
+        with self._changed:
+            self._result = result
+            self.error = error
+            self.complete = True
+            self._changed.notify_all()
+
+    def cancel(self):
+        """
+        Asks the transcription to stop after its next segment and wakes up waiting readers.
+        """
+        with self._changed:
+            self.cancelled = True
+            self._changed.notify_all()
+
+    def wait_past(self, t):
+        """
+        Blocks until the segments shown at time t are known: either a segment starting
+        after t has arrived (later segments start even later) or the transcription is complete.
+        Also returns once the stream is cancelled.
+        Returns: (number of segments available, whether the transcription is complete)
+        """
+        with self._changed:
+            self._changed.wait_for(
+                lambda: self.complete or self.cancelled or (self.segments and self.segments[-1]['start'] > t)
+            )
+            return len(self.segments), self.complete
+
+    def result(self):
+        """
+        Waits for the transcription and returns its result dict (re-raising its error, if any).
+        """
+        with self._changed:
+            self._changed.wait_for(lambda: self.complete)
+        if self.error is not None:
+            raise self.error
+        return self._result
+
+
+def transcribe_in_background(model, input_file, **options):
+    """
+    Starts transcribe() in a background thread.
+    Returns: a SegmentStream that receives the segments as they are decoded.
+    """
+    stream = SegmentStream()
+
+    def run():
+        try:
+            stream.finish(result=transcribe(model, input_file, on_segment=stream.add, **options))
+        except Exception as e:
+            stream.finish(error=e)
+
+    threading.Thread(target=run, daemon=True).start()
+    return stream
+
+
+def _transcribe_batched(model, input_file, task, language, batch_size):
+    """
+    Reference-backend batched transcription: stacks non-overlapping 30s log-mel
+    windows into (N, n_mels, 3000) batches so the encoder runs once per batch,
+    then stitches the decoded segments back together with each window's time offset.
+    """
+    import torch
+    import whisper
+    from whisper.audio import CHUNK_LENGTH, N_SAMPLES
+    from whisper.tokenizer import get_tokenizer
+
+    audio = whisper.load_audio(input_file)
+    n_chunks = max(1, -(-len(audio) // N_SAMPLES))
+    mels = torch.stack([
+        whisper.log_mel_spectrogram(
+            whisper.pad_or_trim(audio[i * N_SAMPLES:(i + 1) * N_SAMPLES]), n_mels=model.dims.n_mels
+        )
+        for i in range(n_chunks)
+    ]).to(model.device)
+
+    options = whisper.DecodingOptions(task=task, language=language, fp16=_use_fp16(model))
+    tokenizer = get_tokenizer(model.is_multilingual, num_languages=model.num_languages, task=task)
+
+    results = []
+    for i in range(0, n_chunks, batch_size):
+        results.extend(model.decode(mels[i:i + batch_size], options))
+
+    segments = []
+    for i, res in enumerate(results):
+        offset = i * float(CHUNK_LENGTH)
+        segments.extend(_split_timestamped_tokens(res.tokens, tokenizer, offset, offset + CHUNK_LENGTH))
+
+    return {'language': language or results[0].language, 'segments': segments}
+
+
+def _split_timestamped_tokens(tokens, tokenizer, offset, window_end):
+    """
+    Splits a decoded token sequence on its <|t|> timestamp tokens into segments,
+    shifting every timestamp by the window offset.
+    """
+    time_precision = 0.02  # seconds per timestamp token step
+    segments = []
+    text_tokens = []
+    start = offset
+
+    for token in tokens:
+        if token >= tokenizer.timestamp_begin:
+            t = offset + (token - tokenizer.timestamp_begin) * time_precision
+            if text_tokens:
+                segments.append({'start': start, 'end': t, 'text': tokenizer.decode(text_tokens)})
+                text_tokens = []
+            start = t
+        elif token < tokenizer.eot:
+            text_tokens.append(token)
+
+    # Trailing text without a closing timestamp runs to the end of the window
+    if text_tokens:
+        segments.append({'start': start, 'end': window_end, 'text': tokenizer.decode(text_tokens)})
+    return segments
@@ -1,14 +1,22 @@
 import os
 import sys
+import json
 import shutil
+import subprocess
+from fractions import Fraction
+from functools import lru_cache
+
+# Subtitle cleanup before drawing (see merge_segments)
+MERGE_MAX_GAP = 0.1          # seconds between repeats of the same text that are bridged
+MIN_SEGMENT_DURATION = 0.05  # shorter fragments are dropped
 
 
 def check_ffmpeg():
     """
     Checks if ffmpeg is installed and available in the system PATH.
     """
-    if not shutil.which("ffmpeg"):
-        print("Error: 'ffmpeg' is not installed or not found in PATH.")
+    if not shutil.which("ffmpeg") or not shutil.which("ffprobe"):
+        print("Error: 'ffmpeg'/'ffprobe' is not installed or not found in PATH.")
         print("Whisper requires ffmpeg for audio processing.")
         print("\nTo fix this:")
         print("  - If using Conda:  conda install -c conda-forge ffmpeg")
@@ -17,23 +25,79 @@ def check_ffmpeg():
         sys.exit(1)
 
 
+@lru_cache(maxsize=1)
 def is_headless():
     """
-    Detects if the environment is headless (no display).
+    Detects if the environment is headless (no display), once per run.
+    On Linux either an X11 or a Wayland display counts; on macOS an SSH session has no display.
     """
     if sys.platform.startswith("linux"):
-        if "DISPLAY" not in os.environ:
-            return True
+        return not (os.environ.get("DISPLAY") or os.environ.get("WAYLAND_DISPLAY"))
+    if sys.platform == "darwin":
+        return bool(os.environ.get("SSH_TTY") or os.environ.get("SSH_CONNECTION"))
     return False
 
 
+@lru_cache(maxsize=None)
+def probe_streams(file_path):
+    """
+    Probes a media file once with ffprobe and caches the result.
+    Returns: dict with 'has_video', 'has_audio', 'audio_codec', 'width', 'height', 'fps', 'total_frames'
+    """
+    info = {'has_video': False, 'has_audio': False, 'audio_codec': None,
+            'width': 0, 'height': 0, 'fps': 0.0, 'total_frames': 0}
+    command = ["ffprobe", "-v", "error", "-show_streams", "-show_format", "-of", "json", file_path]
+    result = subprocess.run(command, capture_output=True, text=True)
+    if result.returncode != 0:
+        return info
+    data = json.loads(result.stdout)
+
+    streams = data.get('streams', [])
+    audio = next((s for s in streams if s.get('codec_type') == 'audio'), None)
+    if audio is not None:
+        info.update(has_audio=True, audio_codec=audio.get('codec_name'))
+
+    # Embedded cover art (e.g. in mp3/m4a) shows up as a video stream; ignore it
+    video = next((s for s in streams if s.get('codec_type') == 'video'
+                  and not s.get('disposition', {}).get('attached_pic')), None)
+    if video is None:
+        return info
+
+    width, height = int(video.get('width', 0)), int(video.get('height', 0))
+    # ffmpeg auto-rotates on decode, so report the displayed frame size
+    if abs(_stream_rotation(video)) in (90, 270):
+        width, height = height, width
+
+    fps = 0.0
+    for key in ('avg_frame_rate', 'r_frame_rate'):
+        num, _, den = video.get(key, '0/0').partition('/')
+        if den and int(den) and int(num):
+            fps = float(Fraction(int(num), int(den)))
+            break
+
+    duration = float(video.get('duration') or data.get('format', {}).get('duration') or 0)
+    nb_frames = str(video.get('nb_frames', ''))
+    total_frames = int(nb_frames) if nb_frames.isdigit() else int(round(duration * fps))
+
+    info.update(has_video=True, width=width, height=height, fps=fps, total_frames=total_frames)
+    return info
+
+
+def _stream_rotation(stream):
+    """
+    Rotation in degrees from a stream's display matrix or legacy 'rotate' tag.
+    """
+    for side_data in stream.get('side_data_list', []):
+        if 'rotation' in side_data:
+            return int(side_data['rotation'])
+    return int(stream.get('tags', {}).get('rotate', 0))
+
+
 def is_audio_only(file_path):
     """
-    Checks if the file is an audio-only format (no video stream).
+    Checks if the file is audio-only (no video stream).
     """
-    audio_extensions = {'.mp3', '.wav', '.flac', '.ogg', '.m4a', '.aac', '.wma'}
-    ext = os.path.splitext(file_path)[1].lower()
-    return ext in audio_extensions
+    return not probe_streams(file_path)['has_video']
 
 
 def get_output_format(output_path):
@@ -50,3 +114,40 @@ def get_output_format(output_path):
         return 'txt'
     else:
         return 'video'
+
+
+def segments_to_soa(segments):
+    """
+    Converts Whisper segments (list of dicts) into parallel arrays.
+    Returns: (starts, ends, texts) with float64 start/end times and the raw texts.
+
+    Times are written straight into preallocated arrays (no intermediate lists).
+    """
+    # Imported here so --help and argument errors don't pay for loading NumPy
+    import numpy as np
+
+    starts = np.fromiter((seg['start'] for seg in segments), dtype=np.float64, count=len(segments))
+    ends = np.fromiter((seg['end'] for seg in segments), dtype=np.float64, count=len(segments))
+    texts = [seg['text'] for seg in segments]
+    return starts, ends, texts
+
+
+def merge_segments(segments, merged=None):
+    """
+    Cleans up segments for drawing: drops fragments shorter than MIN_SEGMENT_DURATION and
+    merges a segment into the previous one when it repeats its text within MERGE_MAX_GAP.
+    Returns: new segment dicts with stripped texts. If merged is given, the results are
+    appended to it (its last segment may be extended), so a growing list can be merged
+    incrementally.
+    """
+    if merged is None:
+        merged = []
+    for seg in segments:
+        if seg['end'] - seg['start'] < MIN_SEGMENT_DURATION:
+            continue
+        text = seg['text'].strip()
+        if merged and text == merged[-1]['text'] and seg['start'] - merged[-1]['end'] < MERGE_MAX_GAP:
+            merged[-1]['end'] = max(merged[-1]['end'], seg['end'])
+        else:
+            merged.append({'start': seg['start'], 'end': seg['end'], 'text': text})
+    return merged
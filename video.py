@@ -1,65 +1,198 @@
 import os
 import time
+import queue
+import tempfile
+import threading
 import subprocess
+from functools import lru_cache
 
 import cv2
-
-
-def draw_subtitle(frame, text):
+import numpy as np
+
+from utils import MERGE_MAX_GAP, merge_segments, probe_streams, segments_to_soa
+from transcription import SegmentStream
+
+# Pipe buffer size for the ffmpeg decode/encode processes (fewer syscalls and stalls)
+PIPE_BUFFER_SIZE = 1 << 20
+
+# Frames read ahead from the decoder and queued for the encoder (together capped by FRAME_POOL_BYTES)
+READ_AHEAD_FRAMES = 8
+WRITE_QUEUE_FRAMES = 32
+FRAME_POOL_BYTES = 256 * 1024 * 1024
+
+# Frame rate of the live window while an output file is being written
+PREVIEW_FPS = 5
+
+# Subtitle style
+FONT = cv2.FONT_HERSHEY_SIMPLEX
+FONT_SCALE = 0.8
+THICKNESS = 2
+COLOR_TEXT = (255, 255, 255)  # White
+COLOR_BG = (0, 0, 0)          # Black
+
+# Style for --burn-native (ASS style overrides for ffmpeg's subtitles filter): white text on a black box
+NATIVE_SUBTITLE_STYLE = "FontSize=24,BorderStyle=3,OutlineColour=&H00000000,Outline=4,Shadow=0"
+
+# H.264 encoders in order of preference for --hwaccel auto
+HW_ENCODERS = {
+    "nvenc": "h264_nvenc",
+    "videotoolbox": "h264_videotoolbox",
+    "vaapi": "h264_vaapi",
+    "qsv": "h264_qsv",
+}
+VAAPI_DEVICE = "/dev/dri/renderD128"
+
+# 4:2:0 output needs even frame sizes: odd ones get a 1-pixel black border on the right/bottom
+EVEN_SIZE_FILTER = "pad=ceil(iw/2)*2:ceil(ih/2)*2"
+
+# Input decoding on the same GPU as the encoder (decoded frames are copied back to system memory)
+HW_DECODERS = {
+    "h264_nvenc": "cuda",
+    "h264_videotoolbox": "videotoolbox",
+}
+
+@lru_cache(maxsize=4096)
+def _text_metrics(text):
     """
-    Helper function to draw text with a background box on a frame.
+    Cached cv2.getTextSize for the subtitle font: a segment's text stays the same for many frames.
     """
-    h, w, _ = frame.shape
+    return cv2.getTextSize(text, FONT, FONT_SCALE, THICKNESS)
+
 
-    # Settings
-    font = cv2.FONT_HERSHEY_SIMPLEX
-    font_scale = 0.8
-    thickness = 2
-    color_text = (255, 255, 255)  # White
-    color_bg = (0, 0, 0)          # Black
+def render_subtitle_overlay(text, width, height):
+    """
+    Renders a subtitle (text on a background box) once for a given frame size.
 
+    Returns (patch, region): the BGR pixels of the box, clipped to the frame, and the
+    (rows, columns) slices of the frame it is copied to. Returns None if the box lies
+    outside the frame.
+    """
     # Get text size to create the background box
-    (text_w, text_h), baseline = cv2.getTextSize(text, font, font_scale, thickness)
+    (text_w, text_h), baseline = _text_metrics(text)
 
     # Coordinates (Centered at bottom)
-    x = (w - text_w) // 2
-    y = h - 50
+    x = (width - text_w) // 2
+    y = height - 50
+
+    # Background box, clipped to the frame
+    x0, y0 = max(x - 10, 0), max(y - text_h - 10, 0)
+    x1, y1 = min(x + text_w + 10, width - 1), min(y + baseline + 10, height - 1)
+    if x1 < x0 or y1 < y0:
+        return None
 
-    # Draw background box (rectangle)
-    cv2.rectangle(frame, (x - 10, y - text_h - 10), (x + text_w + 10, y + baseline + 10), color_bg, -1)
+    # Draw background box (the whole patch) and text, relative to the patch
+    patch = np.empty((y1 - y0 + 1, x1 - x0 + 1, 3), dtype=np.uint8)
+    patch[:] = COLOR_BG
+    cv2.putText(patch, text, (x - x0, y - y0), FONT, FONT_SCALE, COLOR_TEXT, THICKNESS, cv2.LINE_AA)
+    return patch, (slice(y0, y1 + 1), slice(x0, x1 + 1))
 
-    # Draw text
-    cv2.putText(frame, text, (x, y), font, font_scale, color_text, thickness, cv2.LINE_AA)
+
+def composite_overlay(frame, overlay):
+    """
+    Copies a pre-rendered subtitle patch into the frame, touching only the box's pixels.
+    """
+    if overlay is not None:
+        patch, region = overlay
+        frame[region] = patch
     return frame
 
 
-def process_video(input_file, output_path, segments, no_show=False, compress=False):
+def make_overlay_cache(texts, width, height):
+    """
+    Returns a function mapping a segment index to its rendered overlay (None for empty text).
+
+    Each segment is rasterized once, the first time it is shown, and segments with the
+    same text share one patch. Segments that are never reached are never rendered.
+    """
+    overlay_cache = {}
+    by_text = {}
+
+    def overlay_for(idx):
+        if idx not in overlay_cache:
+            text = texts[idx]
+            if text not in by_text:
+                by_text[text] = render_subtitle_overlay(text, width, height) if text else None
+            overlay_cache[idx] = by_text[text]
+        return overlay_cache[idx]
+
+    return overlay_for
+
+
+def segments_at_times(starts, ends, times):
+    """
+    Vectorized subtitle lookup: index of the segment shown at each time (-1 if none).
+
+    A segment is shown at time t when start <= t <= end. Segments must be sorted by start
+    (Whisper emits them in order); where they overlap, the one that started last wins.
+    """
+    times = np.asarray(times, dtype=np.float64)
+    if len(starts) == 0:
+        return np.full(times.shape, -1, dtype=np.int32)
+    i = np.searchsorted(starts, times, side='right') - 1
+    return np.where((i >= 0) & (ends[np.maximum(i, 0)] >= times), i, -1).astype(np.int32)
+
+
+def process_video(input_file, output_path, segments, no_show=False, compress=False, hwaccel="auto",
+                  realtime_preview=False):
     """
     Process video frames, overlay subtitles, and optionally save output.
 
+    Frames are decoded by one ffmpeg process, drawn on in Python, and piped into a
+    second ffmpeg process that encodes them and muxes the original audio in one pass.
+
     Args:
         input_file: Path to input video file
         output_path: Path to save output video (None to skip saving)
-        segments: Transcription segments from Whisper
+        segments: Transcription segments from Whisper, or a SegmentStream of a transcription
+            that is still running (frames are then drawn as soon as their subtitles are known)
         no_show: If True, don't show live preview window
         compress: If True, compress the output video
-    """
-    # Setup Video Capture
-    cap = cv2.VideoCapture(input_file)
-    fps = cap.get(cv2.CAP_PROP_FPS)
-    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-
-    # Setup Video Writer (if output requested)
-    out = None
-    temp_video_path = None
+        hwaccel: Hardware encoder to use ('auto', 'nvenc', 'videotoolbox', 'vaapi', 'qsv' or 'none')
+        realtime_preview: If True, pace the live preview at the video's frame rate even while
+            saving output (without output_path the preview is always paced)
 
+    Returns: False if ffmpeg failed to write the output, True otherwise.
+    """
+    # Read stream metadata (cached from the audio-only check)
+    probe = probe_streams(input_file)
+    fps = probe['fps']
+    width = probe['width']
+    height = probe['height']
+    total_frames = probe['total_frames']
+
+    # Nothing to draw and nothing to show: copy the video stream instead of re-encoding it
+    live = isinstance(segments, SegmentStream)
+    if not live:
+        segments = merge_segments(segments)
+        if not segments and no_show and output_path and not compress:
+            if copy_video(input_file, output_path, probe['audio_codec']):
+                return True
+
+    # Pick the encoder first: with NVENC/VideoToolbox the input is decoded on the same GPU
+    codec = select_video_encoder(hwaccel) if output_path else None
+
+    # Setup Decoder (raw BGR frames on stdout)
+    decoder = subprocess.Popen(
+        _decoder_command(input_file, codec, fps),
+        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, bufsize=PIPE_BUFFER_SIZE
+    )
+
+    # Setup Encoder (if output requested): raw BGR frames on stdin + original audio
+    encoder = None
+    encoder_log = None
     if output_path:
-        # We write to a temp file first (OpenCV creates silent video)
-        temp_video_path = f"temp_silent_{os.path.basename(output_path)}"
-        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-        out = cv2.VideoWriter(temp_video_path, fourcc, fps, (width, height))
-        print(f"Processing video frames to temporary file '{temp_video_path}'...")
+        # ffmpeg's stderr goes to a temp file so a full pipe can never stall the encoder
+        print(f"Using video encoder: {codec}")
+        encoder_log = tempfile.TemporaryFile()
+        encoder = subprocess.Popen(
+            _encoder_command(input_file, output_path, width, height, fps, compress, codec, probe['audio_codec']),
+            stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=encoder_log,
+            bufsize=PIPE_BUFFER_SIZE
+        )
+        if compress:
+            print(f"Encoding and compressing video with original audio to '{output_path}' (this will take longer)...")
+        else:
+            print(f"Encoding video with original audio to '{output_path}'...")
 
     # Process Frames
     start_time = time.time()
@@ -68,113 +201,697 @@ def process_video(input_file, output_path, segments, no_show=False, compress=Fal
     if not no_show:
         print("Press 'q' to quit.")
 
-    # Loop variables
-    frame_idx = 0
-    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    if live:
+        # Texts are filled in as segments arrive
+        texts = []
+        spans = live_frame_spans(segments, texts, fps)
+    else:
+        # Convert the (cleaned-up) segments and strip their texts once
+        starts, ends, texts = segments_to_soa(segments)
+        # Cover every segment even if the container's frame count is off (+2 absorbs float rounding)
+        n_frames = max(total_frames, int(np.floor(ends.max() * fps)) + 2) if len(ends) else total_frames
+
+        def lookup(frames):
+            return segments_at_times(starts, ends, np.asarray(frames) / fps)
+
+        spans = frame_spans(lookup, starts, ends, fps, n_frames)
+
+    # Subtitles are rendered on first use; frames then only copy the box's pixels
+    overlays = make_overlay_cache(texts, width, height)
+
+    frame_shape = (height, width, 3)
 
-    while cap.isOpened():
-        ret, frame = cap.read()
-        if not ret:
+    try:
+        if no_show:
+            _run_headless(decoder, encoder, frame_shape, spans, overlays, total_frames)
+        else:
+            # Without an output file the preview is the result, so it plays at normal speed
+            realtime = realtime_preview or not output_path
+            # Once the window closes, nothing waits for the transcription anymore
+            on_close = segments.cancel if live else None
+            _play_frames(decoder, encoder, frame_shape, spans, overlays, fps, realtime=realtime,
+                         on_close=on_close)
+    except BaseException:
+        # E.g. the transcription failed or Ctrl+C: don't leave a truncated output file behind
+        if encoder:
+            _abort_encoder(encoder, encoder_log, output_path)
+        raise
+    finally:
+        # Cleanup Decoder and OpenCV
+        decoder.stdout.close()
+        decoder.terminate()
+        decoder.wait()
+        if not no_show:
+            cv2.destroyAllWindows()
+    print("\nVisual processing complete.")
+
+    # Finish Encoding
+    if encoder:
+        return _finish_encoder(encoder, encoder_log, output_path)
+    return True
+
+
+def frame_spans(lookup, starts, ends, fps, n_frames, max_span=256):
+    """
+    Splits the first n_frames frames into runs of consecutive frames with the same subtitle.
+    Yields: (first_frame, end_frame, segment_idx), with runs capped at max_span frames,
+    followed by an open-ended run (end_frame None) for any later frames.
+
+    The active segment can only change where a segment starts or ends, so the lookup is
+    only evaluated around those frames (a few candidates each, to absorb float rounding).
+    """
+    yield from _spans_between(lookup, starts, ends, fps, 0, n_frames, max_span)
+    yield n_frames, None, -1
+
+
+def live_frame_spans(stream, texts, fps, max_span=256):
+    """
+    frame_spans for a transcription that is still running: each run is yielded once the
+    segments shown on its frames are known, waiting for the transcription when the video
+    catches up with it. Segments are cleaned up with merge_segments as they arrive, and
+    texts is kept equal to their stripped texts.
+
+    Raises the transcription's error if it fails, and stops once the stream is cancelled.
+    """
+    first = 0
+    wait_for = 0.0
+    consumed = 0
+    merged = []
+    starts = ends = np.empty(0, dtype=np.float64)
+    while True:
+        count, complete = stream.wait_past(wait_for)
+        if stream.error is not None:
+            raise stream.error
+        if stream.cancelled:
+            return
+
+        # Only new segments are merged and converted (plus the last one, which may have grown)
+        keep = max(len(merged) - 1, 0)
+        merge_segments(stream.segments[consumed:count], merged)
+        consumed = count
+        new_starts, new_ends, new_texts = segments_to_soa(merged[keep:])
+        starts = np.concatenate((starts[:keep], new_starts))
+        ends = np.concatenate((ends[:keep], new_ends))
+        texts[keep:] = new_texts
+
+        def lookup(frames, starts=starts, ends=ends):
+            return segments_at_times(starts, ends, np.asarray(frames) / fps)
+
+        if complete:
+            n_frames = max(first, int(ends.max() * fps) + 2) if len(ends) else first
+            yield from _spans_between(lookup, starts, ends, fps, first, n_frames, max_span)
+            yield n_frames, None, -1
+            return
+
+        # Frames before the latest segment's start can no longer change, unless a later
+        # repeat of the last text could still be merged and extend it over the gap
+        latest_start = stream.segments[count - 1]['start']
+        limit = latest_start
+        if len(ends) and latest_start - ends[-1] < MERGE_MAX_GAP:
+            limit = min(limit, ends[-1])
+        stop = _first_frame_at(limit, fps)
+        if stop <= first:
+            # Nothing new is final yet: wait for a segment that starts later
+            wait_for = latest_start
+            continue
+        yield from _spans_between(lookup, starts, ends, fps, first, stop, max_span)
+        first = stop
+        wait_for = first / fps
+
+
+def _first_frame_at(t, fps):
+    """
+    Index of the first frame shown at or after time t (frame i is at i / fps).
+    """
+    frame = max(int(t * fps) + 2, 0)
+    while frame > 0 and (frame - 1) / fps >= t:
+        frame -= 1
+    return frame
+
+
+def _spans_between(lookup, starts, ends, fps, first, stop, max_span):
+    """
+    Runs of frames with the same subtitle among the frames first..stop-1 (see frame_spans).
+    """
+    edges = np.floor(np.concatenate((starts, ends)) * fps)
+    bounds = np.concatenate(([first], edges, edges + 1, edges + 2))
+    bounds = np.unique(np.clip(bounds, first, stop).astype(np.int64))
+    bounds = bounds[bounds < stop]
+
+    if len(bounds):
+        values = np.asarray(lookup(bounds))
+        changed = np.concatenate(([True], values[1:] != values[:-1]))
+        run_starts = bounds[changed].tolist()
+        run_values = values[changed].tolist()
+        run_ends = run_starts[1:] + [stop]
+        for run_first, run_end, idx in zip(run_starts, run_ends, run_values):
+            for a in range(run_first, run_end, max_span):
+                yield a, min(a + max_span, run_end), idx
+
+
+def _process_spans(decoder, encoder, frame_shape, spans, overlays, progress, on_frame=None):
+    """
+    Core frame loop: decodes frames and walks runs of frames that share a subtitle,
+    so frames without one are just passed from decoder to encoder.
+
+    Frames cycle through a small pool of reused buffers: a reader thread fills them from
+    the decoder pipe (up to READ_AHEAD_FRAMES ahead), this thread draws on them, and a
+    writer thread feeds them to the encoder, so reading, drawing and encoding overlap.
+
+    overlays maps a segment index to its overlay (see make_overlay_cache).
+    progress[0] is updated with the number of frames done after every run. on_frame, if
+    given, is called with each finished frame and stops the loop by returning False.
+    """
+    frame_bytes = int(np.prod(frame_shape))
+    pool_size = READ_AHEAD_FRAMES + (WRITE_QUEUE_FRAMES if encoder else 0)
+    pool_size = max(2, min(pool_size, FRAME_POOL_BYTES // frame_bytes))
+    free = queue.Queue()
+    for _ in range(pool_size):
+        frame_buf = np.empty(frame_shape, dtype=np.uint8)
+        free.put((frame_buf, memoryview(frame_buf).cast('B')))
+
+    ready = queue.Queue()
+    stop_reading = threading.Event()
+    reader = threading.Thread(target=_read_frames, args=(decoder.stdout, free, ready, stop_reading), daemon=True)
+    reader.start()
+
+    pending = queue.Queue()
+    failed = threading.Event()
+    writer = None
+    if encoder:
+        writer = threading.Thread(target=_write_frames, args=(encoder.stdin, pending, free, failed), daemon=True)
+        writer.start()
+
+    try:
+        for first, end, idx in spans:
+            overlay = overlays(idx) if idx >= 0 else None
+
+            frame_idx = first
+            while end is None or frame_idx < end:
+                item = ready.get()
+                if item is None or failed.is_set():
+                    return
+                frame_buf = item[0]
+                if overlay is not None:
+                    composite_overlay(frame_buf, overlay)
+                # The buffer is refilled once it is back in the pool, so on_frame goes first
+                keep_going = on_frame is None or on_frame(frame_buf)
+                (pending if writer else free).put(item)
+                if not keep_going:
+                    return
+                frame_idx += 1
+            progress[0] = frame_idx
+    finally:
+        stop_reading.set()
+        free.put(None)
+        reader.join()
+        if writer:
+            pending.put(None)
+            writer.join()
+
+
+def _read_frames(stream, free, ready, stop):
+    """
+    Reader thread for _process_spans: fills buffers from the pool with frames from the
+    decoder pipe and queues them in ready, followed by None at the end of the stream.
+    """
+    while not stop.is_set():
+        item = free.get()
+        if item is None or stop.is_set() or not _read_frame(stream, item[1]):
             break
+        ready.put(item)
+    ready.put(None)
 
-        # Calculate timestamp (in seconds) based on frame count and FPS
-        current_timestamp = frame_idx / fps
 
-        # Find active subtitle
-        current_text = ""
-        for seg in segments:
-            if seg["start"] <= current_timestamp <= seg["end"]:
-                current_text = seg["text"].strip()
-                break
+def _write_frames(stdin, pending, free, failed):
+    """
+    Writer thread for _process_spans: sends queued frames to the encoder and returns
+    their buffers to the pool. If the encoder goes away, failed is set and the remaining
+    frames are dropped.
+    """
+    while True:
+        item = pending.get()
+        if item is None:
+            return
+        if not failed.is_set():
+            try:
+                stdin.write(item[1])
+            except OSError:  # BrokenPipeError included
+                failed.set()
+        free.put(item)
+
+
+def _run_headless(decoder, encoder, frame_shape, spans, overlays, total_frames):
+    """
+    Runs the frame loop without a window; progress is printed from a watcher thread.
+    """
+    progress = [0]
+    done = threading.Event()
+    watcher = threading.Thread(target=_report_progress, args=(progress, total_frames, done), daemon=True)
+    watcher.start()
+    try:
+        _process_spans(decoder, encoder, frame_shape, spans, overlays, progress)
+    finally:
+        done.set()
+        watcher.join()
 
-        # Draw the subtitle if text exists
-        if current_text:
-            frame = draw_subtitle(frame, current_text)
 
-        # Write to file if output path was provided
-        if out:
-            out.write(frame)
+def _report_progress(progress, total_frames, done, interval=0.5):
+    """
+    Prints the share of processed frames until done is set.
+    """
+    while not done.wait(interval):
+        if total_frames:
+            print(f"Processing: {min(100, int(progress[0] / total_frames * 100))}%", end='\r')
 
-        # Show live window if not disabled
-        if not no_show:
-            cv2.imshow('Whisper Subtitle Player', frame)
 
-            # WaitKey controls playback speed.
-            delay = int(1000 / fps)
+def _play_frames(decoder, encoder, frame_shape, spans, overlays, fps, realtime=False, on_close=None):
+    """
+    Preview frame loop: a worker thread decodes, draws and encodes frames while this
+    (main) thread shows them in a window.
+
+    By default processing runs as fast as possible and the window shows about PREVIEW_FPS
+    frames per second (fewer if it cannot keep up). With realtime=True every frame is shown
+    at the video's frame rate.
+
+    on_close, if given, is called when the window loop ends (also on 'q' or Ctrl+C), before
+    waiting for the worker; use it to release anything the spans may be waiting on.
+    An error in the worker is re-raised here once it has stopped.
+    """
+    preview = queue.Queue(maxsize=2)
+    stop = threading.Event()
+    errors = []
+    worker = threading.Thread(
+        target=_render_frames,
+        args=(decoder, encoder, frame_shape, spans, overlays, preview, stop, realtime,
+              max(1, round(fps / PREVIEW_FPS)), errors),
+        daemon=True
+    )
+    worker.start()
+
+    # WaitKey controls playback speed.
+    delay = max(1, int(1000 / fps)) if realtime else 1
+    try:
+        while True:
+            try:
+                frame = preview.get(timeout=0.05)
+            except queue.Empty:
+                # E.g. waiting for the transcription: keep the window responsive
+                if cv2.waitKey(1) & 0xFF == ord('q'):
+                    break
+                continue
+            if frame is None:
+                break
+            cv2.imshow('Whisper Subtitle Player', frame)
             if cv2.waitKey(delay) & 0xFF == ord('q'):
                 break
-        else:
-            # Simple progress log if we aren't showing the video
-            if frame_idx % 60 == 0:
-                print(f"Processing: {int((frame_idx/total_frames)*100)}%", end='\r')
+    finally:
+        # Also on Ctrl+C: the worker stops at its next frame and no longer waits on the queue
+        stop.set()
+        if on_close is not None:
+            on_close()
+        worker.join()
 
-        frame_idx += 1
+    if errors:
+        raise errors[0]
 
-    # Cleanup OpenCV
-    cap.release()
-    if out:
-        out.release()
-    if not no_show:
-        cv2.destroyAllWindows()
-    print("\nVisual processing complete.")
 
-    # Merge Audio with FFmpeg
-    if output_path and temp_video_path and os.path.exists(temp_video_path):
-        _merge_audio(input_file, output_path, temp_video_path, compress)
+def _render_frames(decoder, encoder, frame_shape, spans, overlays, preview, stop, realtime, every=1,
+                   errors=None):
+    """
+    Worker for _play_frames: runs the frame loop and hands frames to the preview queue.
+    Unless realtime, only every 'every'-th frame is offered, and dropped if the window falls behind.
 
+    Ends the queue with None, also when the loop fails; the exception is appended to errors.
+    """
+    count = [0]
+
+    def show(frame):
+        # Frame buffers are reused, so only frames that are shown get copied
+        count[0] += 1
+        if realtime:
+            _put_until_stopped(preview, frame.copy(), stop)
+        elif count[0] % every == 0 and not preview.full():
+            try:
+                preview.put_nowait(frame.copy())
+            except queue.Full:
+                pass
+        return not stop.is_set()
 
-def _merge_audio(input_file, output_path, temp_video_path, compress):
+    try:
+        _process_spans(decoder, encoder, frame_shape, spans, overlays, [0], on_frame=show)
+    except Exception as e:
+        if errors is not None:
+            errors.append(e)
+    finally:
+        _put_until_stopped(preview, None, stop)
+
+
+def _put_until_stopped(preview, item, stop):
+    """
+    Puts item on the preview queue, giving up once stop is set (the window is no longer read).
+    """
+    while not stop.is_set():
+        try:
+            preview.put(item, timeout=0.1)
+            return
+        except queue.Full:
+            pass
+
+
+def _read_frame(stream, frame_view):
+    """
+    Fills frame_view with the next raw frame from the decoder pipe.
+    Returns: False at end of stream (or on a truncated last frame).
+    """
+    filled = 0
+    while filled < len(frame_view):
+        n = stream.readinto(frame_view[filled:])
+        if not n:
+            return False
+        filled += n
+    return True
+
+
+def _decoder_command(input_file, codec=None, fps=None):
+    """
+    FFmpeg command that decodes the input video to raw BGR frames on stdout.
+    If the output is encoded with a GPU encoder (codec), the input is decoded on that GPU too.
+
+    Frames are output at a constant fps (duplicated/dropped as needed for variable frame rate
+    input), so frame i is shown at exactly i / fps, the time used for subtitles and the encoder.
+    """
+    rate_args = ["-vsync", "cfr", "-r", str(fps)] if fps else []
+    return [
+        "ffmpeg",
+        "-v", "error",
+        *_hw_decode_args(codec),
+        "-threads", "0",        # Decode with all cores
+        "-i", input_file,       # Input video
+        *rate_args,             # Constant frame rate
+        "-f", "rawvideo",       # Raw frames, no container
+        "-pix_fmt", "bgr24",    # OpenCV's channel order
+        "-"                     # Write to stdout
+    ]
+
+
+def _hw_decode_args(codec):
+    """
+    FFmpeg input arguments for hardware decoding matching the encoder (none for other encoders).
+    ffmpeg falls back to software decoding for codecs the GPU cannot decode.
+    """
+    if codec in HW_DECODERS:
+        return ["-hwaccel", HW_DECODERS[codec]]
+    return []
+
+
+@lru_cache(maxsize=None)
+def select_video_encoder(hwaccel="auto"):
+    """
+    Picks the H.264 encoder for the output video.
+    Returns: the name of a hardware encoder that works on this machine, or 'libx264'.
+
+    Encoders are probed once with a tiny test encode, since ffmpeg builds often list
+    hardware encoders that have no usable device behind them.
     """
-    Merge audio from original file into the processed video using FFmpeg.
+    if hwaccel == "none":
+        return "libx264"
+
+    candidates = HW_ENCODERS.values() if hwaccel == "auto" else [HW_ENCODERS[hwaccel]]
+    for codec in candidates:
+        if _encoder_works(codec):
+            return codec
+
+    if hwaccel != "auto":
+        print(f"WARNING: Hardware encoder '{HW_ENCODERS[hwaccel]}' is not available. Falling back to libx264.")
+    return "libx264"
+
+
+@lru_cache(maxsize=1)
+def _ffmpeg_encoders():
+    """
+    Output of 'ffmpeg -encoders', fetched once.
     """
+    return subprocess.run(["ffmpeg", "-hide_banner", "-encoders"], capture_output=True, text=True).stdout
+
+
+def _encoder_works(codec):
+    """
+    Checks that ffmpeg lists the encoder and can encode a short test clip with it.
+    """
+    if codec not in _ffmpeg_encoders():
+        return False
+
+    pre_input_args, codec_args = _video_codec_args(codec, compress=False)
+    command = [
+        "ffmpeg", "-v", "error",
+        *pre_input_args,
+        "-f", "lavfi", "-i", "color=size=256x256:duration=0.1",
+        *codec_args,
+        "-f", "null", "-"
+    ]
+    return subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL).returncode == 0
+
+
+def _video_codec_args(codec, compress):
+    """
+    Encoder-specific FFmpeg arguments.
+    Returns: (args placed before the inputs, args placed after the stream mapping)
+    """
+    # Hardware encoders get constant quality too (their default is a low fixed bitrate):
+    # roughly libx264's default CRF 23, or CRF 28 when compressing
+    quality = "28" if compress else "23"
+
+    if codec == "h264_nvenc":
+        preset = "p4" if compress else "p1"
+        return [], ["-c:v", codec, "-preset", preset, "-rc", "vbr", "-cq", quality, "-b:v", "0", "-pix_fmt", "yuv420p"]
+
+    if codec == "h264_videotoolbox":
+        # Constant quality on a 1-100 scale (higher = better)
+        return [], ["-c:v", codec, "-q:v", "55" if compress else "65", "-pix_fmt", "yuv420p"]
+
+    if codec == "h264_vaapi":
+        # Frames are uploaded to the GPU surface as NV12
+        return ["-vaapi_device", VAAPI_DEVICE], ["-vf", "format=nv12,hwupload", "-c:v", codec, "-qp", quality]
+
+    if codec == "h264_qsv":
+        preset = "medium" if compress else "veryfast"
+        return [], ["-c:v", codec, "-preset", preset, "-global_quality", quality, "-pix_fmt", "nv12"]
+
     if compress:
-        print("Merging audio and compressing video (this will take longer)...")
-    else:
-        print("Merging original audio into final video...")
+        return [], [
+            "-c:v", "libx264",      # Use H.264 codec
+            "-crf", "28",           # Constant Rate Factor (18-28 is good, higher = smaller file)
+            "-preset", "medium",    # Encoding speed (slow = better compression)
+            "-x264-params", "threads=auto:sliced-threads=1",  # Slice threading keeps short clips multithreaded
+            "-pix_fmt", "yuv420p",  # Widely playable pixel format
+        ]
+    return [], [
+        "-c:v", "libx264",          # Use H.264 codec
+        "-preset", "ultrafast",     # Favour encoding speed over file size
+        "-pix_fmt", "yuv420p",      # Widely playable pixel format
+    ]
+
+
+def _encoder_command(input_file, output_path, width, height, fps, compress, codec="libx264", audio_codec=None):
+    """
+    FFmpeg command that encodes raw BGR frames from stdin and muxes in the original audio.
+    """
+    pre_input_args, video_args = _video_codec_args(codec, compress)
+    filter_args, video_args = _merge_filters([EVEN_SIZE_FILTER], video_args)
+    audio_args = _audio_codec_args(compress, audio_codec)
+
+    return [
+        "ffmpeg",
+        "-y",                       # Overwrite output without asking
+        "-v", "error",
+        *pre_input_args,
+        "-f", "rawvideo",           # Input 0: Raw frames from stdin
+        "-pix_fmt", "bgr24",
+        "-s", f"{width}x{height}",
+        "-r", str(fps),
+        "-i", "-",
+        "-i", input_file,           # Input 1: Original video with audio
+        "-map", "0:v:0",            # Map video from Input 0
+        "-map", "1:a:0?",           # Map audio from Input 1 (if it has any)
+        *filter_args,
+        *video_args,
+        "-threads", "0",            # Let the encoder use all cores
+        *audio_args,
+        "-shortest",                # Stop when the shortest stream ends
+        output_path                 # Final output file
+    ]
+
+
+def _merge_filters(filters, video_args):
+    """
+    Combines filters with the encoder's own -vf chain (e.g. VAAPI's hwupload), which goes last.
+    Returns: (the -vf arguments, video_args without their -vf)
+    """
+    if "-vf" in video_args:
+        i = video_args.index("-vf")
+        filters = filters + [video_args[i + 1]]
+        video_args = video_args[:i] + video_args[i + 2:]
+    return ["-vf", ",".join(filters)], video_args
 
-    try:
-        if compress:
-            # Compression mode: Re-encode video with H.264 and compress audio
-            command = [
-                "ffmpeg",
-                "-y",                   # Overwrite output without asking
-                "-i", temp_video_path,  # Input 0: Silent video we just made
-                "-i", input_file,       # Input 1: Original video with audio
-                "-c:v", "libx264",      # Use H.264 codec
-                "-crf", "28",           # Constant Rate Factor (18-28 is good, higher = smaller file)
-                "-preset", "medium",    # Encoding speed (slow = better compression)
-                "-c:a", "aac",          # AAC audio codec
-                "-b:a", "128k",         # Audio bitrate
-                "-map", "0:v:0",        # Map video from Input 0
-                "-map", "1:a:0",        # Map audio from Input 1
-                "-shortest",            # Stop when the shortest stream ends
-                output_path             # Final output file
-            ]
-        else:
-            # Fast mode: Copy video stream without re-encoding
-            command = [
-                "ffmpeg",
-                "-y",                   # Overwrite output without asking
-                "-i", temp_video_path,  # Input 0: Silent video we just made
-                "-i", input_file,       # Input 1: Original video with audio
-                "-c:v", "copy",         # Copy video stream (don't re-encode)
-                "-c:a", "aac",          # Encode audio to AAC
-                "-map", "0:v:0",        # Map video from Input 0
-                "-map", "1:a:0",        # Map audio from Input 1
-                "-shortest",            # Stop when the shortest stream ends
-                output_path             # Final output file
-            ]
-
-        # Run the command silently
-        subprocess.run(command, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+def _audio_codec_args(compress, audio_codec=None):
+    """
+    FFmpeg arguments for the output audio. AAC input audio is copied as is unless compressing.
+    """
+    if audio_codec == "aac" and not compress:
+        return [
+            "-c:a", "copy",         # Already AAC: no need to re-encode
+        ]
+    if compress:
+        return [
+            "-c:a", "aac",          # AAC audio codec
+            "-b:a", "128k",         # Audio bitrate
+        ]
+    return [
+        "-c:a", "aac",              # Encode audio to AAC
+    ]
+
+
+def burn_subtitles(input_file, output_path, segments, compress=False, hwaccel="auto"):
+    """
+    Burns the subtitles into the video with FFmpeg's subtitles filter in a single pass,
+    without decoding frames into Python (used for --burn-native).
+
+    The segments are written to a temporary SRT file that the filter renders with libass,
+    so the subtitle style differs slightly from the OpenCV overlay.
+
+    Args:
+        input_file: Path to input video file
+        output_path: Path to save output video
+        segments: Transcription segments from Whisper
+        compress: If True, compress the output video
+        hwaccel: Hardware encoder to use ('auto', 'nvenc', 'videotoolbox', 'vaapi', 'qsv' or 'none')
+
+    Returns: False if ffmpeg failed to write the output, True otherwise.
+    """
+    from output import write_srt
+
+    audio_codec = probe_streams(input_file)['audio_codec']
+    if not compress and not merge_segments(segments):
+        if copy_video(input_file, output_path, audio_codec):
+            return True
+
+    codec = select_video_encoder(hwaccel)
+    print(f"Using video encoder: {codec}")
+    print(f"Burning subtitles into '{output_path}' with ffmpeg...")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        srt_path = os.path.join(tmp_dir, "subtitles.srt")
+        write_srt(segments, srt_path)
+        result = subprocess.run(
+            _burn_command(input_file, output_path, srt_path, compress, codec, audio_codec),
+            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+        )
+
+    if result.returncode == 0:
         print(f"Success! Final video with audio saved to: {output_path}")
+        return True
+    print("Error encoding video with ffmpeg.")
+    print(f"FFmpeg stderr: {result.stderr.decode(errors='replace')}")
+    return False
 
-        # Delete the temporary silent file
-        os.remove(temp_video_path)
 
-    except subprocess.CalledProcessError as e:
-        print("Error merging audio with ffmpeg.")
-        print(f"FFmpeg stderr: {e.stderr.decode()}")
-        print(f"The silent video is still available at: {temp_video_path}")
-    except Exception as e:
-        print(f"An unexpected error occurred: {e}")
+def _burn_command(input_file, output_path, srt_path, compress, codec="libx264", audio_codec=None):
+    """
+    FFmpeg command that re-encodes the input with the SRT file drawn on every frame.
+    """
+    pre_input_args, video_args = _video_codec_args(codec, compress)
+    subtitles = f"subtitles=filename={_escape_filter_path(srt_path)}:force_style='{NATIVE_SUBTITLE_STYLE}'"
+    filter_args, video_args = _merge_filters([subtitles, EVEN_SIZE_FILTER], video_args)
+
+    return [
+        "ffmpeg",
+        "-y",                       # Overwrite output without asking
+        "-v", "error",
+        *pre_input_args,
+        *_hw_decode_args(codec),
+        "-i", input_file,
+        "-map", "0:v:0",            # First video stream
+        "-map", "0:a:0?",           # First audio stream (if there is one)
+        *filter_args,
+        *video_args,
+        "-threads", "0",            # Let the encoder use all cores
+        *_audio_codec_args(compress, audio_codec),
+        output_path
+    ]
+
+
+def copy_video(input_file, output_path, audio_codec=None):
+    """
+    Writes the input's video stream to output_path unchanged (no subtitles to draw), with
+    the audio handled as in a normal run.
+    Returns: True on success; False if ffmpeg cannot copy the stream into this output.
+    """
+    print(f"No subtitles to draw: copying the video stream to '{output_path}'...")
+    command = [
+        "ffmpeg",
+        "-y",                       # Overwrite output without asking
+        "-v", "error",
+        "-i", input_file,
+        "-map", "0:v:0",            # First video stream
+        "-map", "0:a:0?",           # First audio stream (if there is one)
+        "-c:v", "copy",             # No re-encode
+        *_audio_codec_args(False, audio_codec),
+        output_path
+    ]
+    if subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL).returncode != 0:
+        print("Stream copy is not possible for this output. Re-encoding instead.")
+        return False
+
+    print(f"Success! Final video with audio saved to: {output_path}")
+    return True
+
+
+def _escape_filter_path(path):
+    """
+    Escapes a file path for use as a filter option value inside a -vf filtergraph.
+    Both levels are backslash-escaped: first the option value, then the filtergraph.
+    """
+    for special in ("\\':", "\\'[],;"):
+        path = "".join("\\" + c if c in special else c for c in path)
+    return path
+
+
+def _abort_encoder(encoder, encoder_log, output_path):
+    """
+    Stops the encoder without finalizing its output and deletes the partial file.
+    """
+    encoder.kill()
+    encoder.wait()
+    try:
+        encoder.stdin.close()
+    except BrokenPipeError:
+        pass
+    encoder_log.close()
+    try:
+        os.remove(output_path)
+    except OSError:
+        pass
+    print(f"\nAborted: '{output_path}' was not written.")
+
+
+def _finish_encoder(encoder, encoder_log, output_path):
+    """
+    Closes the encoder's input and waits for FFmpeg to finalize the output file.
+    Returns: True if the file was written successfully.
+    """
+    try:
+        encoder.stdin.close()
+    except BrokenPipeError:
+        pass
+    returncode = encoder.wait()
+
+    if returncode == 0:
+        print(f"Success! Final video with audio saved to: {output_path}")
+    else:
+        encoder_log.seek(0)
+        print("Error encoding video with ffmpeg.")
+        print(f"FFmpeg stderr: {encoder_log.read().decode(errors='replace')}")
+    encoder_log.close()
+    return returncode == 0